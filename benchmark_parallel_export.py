@@ -0,0 +1,76 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+import wiki_crawler_v2
+from wiki_crawler_v2 import build_enriched_graph, export_enriched_graph
+
+# ==================== CONFIGURACIÓN ====================
+
+N_PAGES = 50_000        # Páginas crawleadas del grafo sintético
+AVG_LINKS = 20          # Links salientes promedio por página
+MISSING_RATIO = 0.05    # Fracción de targets que son red links
+WORKERS = os.cpu_count() or 1
+SEED = 42
+
+# ==================== GRAFO SINTÉTICO ====================
+
+def random_normalized_graph(n_pages, avg_links=AVG_LINKS, seed=SEED):
+    """Grafo ya normalizado (listas ordenadas) con algunos aliases y missing pages"""
+    rng = random.Random(seed)
+    titles = [f'Page {i}' for i in range(n_pages)]
+    missing = [f'Missing {i}' for i in range(int(n_pages * MISSING_RATIO))]
+
+    graph = {}
+    for title in titles:
+        k = rng.randint(0, 2 * avg_links)
+        targets = set(rng.choices(titles, k=k))
+        targets.update(rng.sample(missing, min(len(missing), k // 20)))
+        targets.discard(title)
+        graph[title] = sorted(targets)
+
+    aliases = {title: [f'{title} (redirect)'] for title in rng.sample(titles, n_pages // 10)}
+    missing_pages = {title: rng.randint(1, 50) for title in missing}
+    return graph, aliases, missing_pages, titles
+
+# ==================== MAIN ====================
+
+def timed_export(enriched, workers, filename):
+    wiki_crawler_v2.WORKERS = workers
+    start = time.perf_counter()
+    export_enriched_graph(enriched, filename)
+    return time.perf_counter() - start
+
+
+def main():
+    print("⏱️  BENCHMARK: EXPORT PARALELO")
+    print("="*60)
+
+    n_pages = int(sys.argv[1]) if len(sys.argv) > 1 else N_PAGES
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else WORKERS
+
+    graph, aliases, missing_pages, titles = random_normalized_graph(n_pages)
+    enriched = build_enriched_graph(graph, aliases, missing_pages, titles)
+    meta = enriched['metadata']
+    print(f"\nGrafo: {meta['total_nodes']} nodos, {meta['total_edges']} edges, {os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial_file = os.path.join(tmp, 'serial.json')
+        parallel_file = os.path.join(tmp, 'parallel.json')
+
+        serial_time = timed_export(enriched, 1, serial_file)
+        parallel_time = timed_export(enriched, workers, parallel_file)
+
+        with open(serial_file, 'rb') as a, open(parallel_file, 'rb') as b:
+            identical = a.read() == b.read()
+
+    print("\n" + "="*60)
+    print(f"   WORKERS = 1:  {serial_time:8.2f}s")
+    print(f"   WORKERS = {workers}:  {parallel_time:8.2f}s  ({serial_time / parallel_time:.1f}x)")
+    print(f"   Salida idéntica: {'sí' if identical else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import random
+import sys
+import time
+from collections import defaultdict
+from itertools import accumulate
+from math import sqrt
+
+from wiki_crawler_v2 import RELATED_MAX_SHARED_DEGREE, compute_related_pages
+
+# ==================== CONFIGURACIÓN ====================
+
+NAIVE_NODES = 1500      # El loop naive es O(n²): mantenerlo chico
+SCALE_NODES = 100_000   # Tamaño objetivo para la versión vectorizada
+AVG_LINKS = 12          # Links salientes promedio por página (~ la wiki actual)
+TOP_K = 10
+SEED = 42
+
+# ==================== GRAFO SINTÉTICO ====================
+
+def random_wiki_graph(n_nodes, avg_links=AVG_LINKS, seed=SEED):
+    """Grafo dirigido con popularidad sesgada (pocas páginas muy citadas, como en la wiki)"""
+    rng = random.Random(seed)
+    titles = [f'Page {i}' for i in range(n_nodes)]
+    cum_weights = list(accumulate(1.0 / (i + 1) for i in range(n_nodes)))
+
+    edges = set()
+    for source in range(n_nodes):
+        k = rng.randint(0, 2 * avg_links)
+        for target in rng.choices(range(n_nodes), cum_weights=cum_weights, k=k):
+            if target != source:
+                edges.add((titles[source], titles[target]))
+
+    return titles, sorted(edges)
+
+# ==================== NAIVE ====================
+
+def naive_related_pages(titles, edge_pairs, top_k=TOP_K, max_shared_degree=RELATED_MAX_SHARED_DEGREE):
+    """Referencia: compara cada par de páginas con sets de Python"""
+    out_degree = defaultdict(int)
+    in_degree = defaultdict(int)
+    for source, target in edge_pairs:
+        out_degree[source] += 1
+        in_degree[target] += 1
+
+    # Mismas reglas que compute_related_pages: las páginas hub no cuentan como vecino compartido
+    cited_by = defaultdict(set)
+    cites = defaultdict(set)
+    for source, target in edge_pairs:
+        if in_degree[target] <= max_shared_degree:
+            cites[source].add(target)
+        if out_degree[source] <= max_shared_degree:
+            cited_by[target].add(source)
+
+    def cosine(a, b):
+        if not a or not b:
+            return 0.0
+        return len(a & b) / sqrt(len(a) * len(b))
+
+    index = {title: i for i, title in enumerate(titles)}
+    related = {}
+    for title in titles:
+        scores = []
+        for other in titles:
+            if other == title:
+                continue
+            cocitation = cosine(cited_by[title], cited_by[other])
+            coupling = cosine(cites[title], cites[other])
+            score = round((cocitation + coupling) * 0.5, 9)
+            if score > 0:
+                scores.append((-score, index[other], other))
+        scores.sort()
+        related[title] = [other for _, _, other in scores[:top_k]]
+
+    return related
+
+# ==================== MAIN ====================
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    print("⏱️  BENCHMARK: RELATED PAGES")
+    print("="*60)
+
+    # 1) Naive vs vectorizado en un grafo chico (y verificación de resultados)
+    titles, edges = random_wiki_graph(NAIVE_NODES)
+    print(f"\nGrafo chico: {len(titles)} nodos, {len(edges)} edges")
+
+    naive, naive_time = timed(naive_related_pages, titles, edges)
+    fast, fast_time = timed(compute_related_pages, titles, edges, top_k=TOP_K)
+
+    mismatches = sum(1 for title in titles if naive[title] != fast[title])
+    print(f"   Naive:       {naive_time:8.2f}s")
+    print(f"   Vectorizado: {fast_time:8.2f}s  ({naive_time / fast_time:.0f}x)")
+    print(f"   Listas distintas: {mismatches}/{len(titles)}")
+
+    # 2) Vectorizado a escala
+    n_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else SCALE_NODES
+    titles, edges = random_wiki_graph(n_nodes)
+    print(f"\nGrafo grande: {len(titles)} nodos, {len(edges)} edges")
+
+    _, fast_time = timed(compute_related_pages, titles, edges, top_k=TOP_K)
+    print(f"   Vectorizado: {fast_time:8.2f}s")
+
+    # Estimación del naive (O(n²)) a partir del grafo chico
+    estimate = naive_time * (n_nodes / NAIVE_NODES) ** 2
+    print(f"   Naive (estimado): {estimate / 3600:8.1f}h")
+
+
+if __name__ == "__main__":
+    main()
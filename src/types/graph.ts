@@ -25,6 +25,13 @@ export interface EnrichedNode {
   exists: boolean
   aliases: string[]
   type: 'canonical' | 'missing'
+  related?: string[] // Top-k related pages (co-citation + coupling), most similar first
+  // Page metadata (existing pages only)
+  length?: number // Page size in bytes
+  touched?: string // ISO timestamp of last page touch
+  categories?: string[] // Visible categories, without the "Category:" prefix
+  backlinks?: number // Main-namespace pages linking here
+  pageprops?: Record<string, string>
 }
 
 export interface EnrichedEdge {
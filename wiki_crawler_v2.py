@@ -1,14 +1,47 @@
+import argparse
+import hashlib
+import numpy as np
 import requests
 import json
+import multiprocessing
+import os
+import sqlite3
+import sys
 import time
 import re
+import zlib
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from scipy import sparse
 
 # ==================== CONFIGURACIÓN ====================
 
 API_URL = "https://wiki.remilia.org/api.php"
 BATCH_SIZE = 50  # Páginas por batch query
 RATE_LIMIT_DELAY = 0.3  # Segundos entre requests
+API_RETRIES = 3  # Intentos por request en pasadas que no toleran huecos (metadata)
+
+# Modo disco: los links se guardan en SQLite en vez de en RAM (wikis grandes)
+DISK_MODE = False
+EDGE_STORE_PATH = 'remilia_graph_edges.db'
+MEMORY_BUDGET_MB = 64  # Presupuesto de RAM para el modo disco
+
+# Procesos para codificar el JSON enriquecido en el export; 1 = serial
+WORKERS = 1
+SHARDS_PER_WORKER = 4  # Más shards que workers para balancear carga
+
+# Related pages: top-k por co-citación + acoplamiento bibliográfico (0 para desactivar)
+RELATED_TOP_K = 10
+RELATED_BLOCK_NNZ = 5_000_000  # Entradas máximas por bloque del producto matricial (acota la RAM)
+RELATED_MAX_SHARED_DEGREE = 1000  # Páginas hub con más links que esto no aportan similitud
+
+# Historial de corridas (None para desactivar)
+SNAPSHOT_STORE_PATH = 'remilia_snapshots.db'
+
+# Caché de outputs por etapa del pipeline (ver PIPELINE)
+PIPELINE_CACHE_DIR = '.pipeline_cache'
 
 # Prefijos de páginas a EXCLUIR completamente
 EXCLUDE_PREFIXES = [
@@ -31,15 +64,18 @@ EXCLUDE_KEYWORDS = [
     'Navigation',
 ]
 
+# Errores de API de la etapa en curso: los helpers avisan y siguen con
+# resultados parciales, así que el pipeline los usa para no cachear un output
+# degradado (ver run_pipeline)
+_API_ERRORS = []
+
 # ==================== PHASE 1: BASIC CRAWL ====================
 
-def get_all_wiki_pages():
-    """Obtiene lista de TODAS las páginas existentes en la wiki"""
-    all_pages = []
+def iter_all_wiki_pages():
+    """Itera los títulos de TODAS las páginas existentes en la wiki"""
+    discovered = 0
     continue_param = {}
     
-    print("🔍 Phase 1: Descubriendo páginas de la wiki...")
-    
     while True:
         params = {
             'action': 'query',
@@ -57,9 +93,10 @@ def get_all_wiki_pages():
         for page in pages:
             title = page['title']
             if not is_non_english(title):
-                all_pages.append(title)
+                discovered += 1
+                yield title
         
-        print(f"  Descubiertas: {len(all_pages)} páginas...")
+        print(f"  Descubiertas: {discovered} páginas...")
         
         if 'continue' in data:
             continue_param = data['continue']
@@ -67,6 +104,13 @@ def get_all_wiki_pages():
             break
         
         time.sleep(RATE_LIMIT_DELAY)
+
+
+def get_all_wiki_pages():
+    """Obtiene lista de TODAS las páginas existentes en la wiki"""
+    print("🔍 Phase 1: Descubriendo páginas de la wiki...")
+    
+    all_pages = list(iter_all_wiki_pages())
     
     print(f"✅ Total páginas encontradas: {len(all_pages)}\n")
     return all_pages
@@ -103,6 +147,7 @@ def get_page_links_api(page_title):
                 break
         except Exception as e:
             print(f"  ⚠️ API error for {page_title}: {e}")
+            _API_ERRORS.append(f"links de {page_title}: {e}")
             break
         
         time.sleep(RATE_LIMIT_DELAY)
@@ -183,6 +228,65 @@ def crawl_wiki(pages, verbose=True):
     return graph, stats
 
 
+# ==================== POST-PROCESAMIENTO PARALELO ====================
+#
+# Solo la codificación del JSON enriquecido se reparte en un
+# ProcessPoolExecutor: es la única etapa donde cada worker devuelve algo
+# barato de transferir (un string ya codificado) a cambio de mucho trabajo.
+# Normalizar, contar referencias o armar nodes/edges en paralelo no rinde:
+# el proceso padre tarda más en despicklear y combinar los resultados que
+# en calcularlos de forma serial. Los inputs compartidos se heredan por fork
+# en vez de picklearse por tarea; cada tarea recibe solo los límites de su
+# shard y los chunks se escriben en orden, así que la salida es idéntica a
+# la serial.
+
+_SHARED = {}
+
+
+def _init_shared(shared):
+    """Initializer para plataformas sin fork: recibe los inputs una vez por worker"""
+    _SHARED.update(shared)
+
+
+def _shard_bounds(n_items):
+    """Divide range(n_items) en shards contiguos [(inicio, fin), ...]"""
+    n_shards = max(1, min(n_items, WORKERS * SHARDS_PER_WORKER))
+    step = max(1, -(-n_items // n_shards))
+    return [(start, min(start + step, n_items)) for start in range(0, n_items, step)]
+
+
+def _run_sharded(worker, n_items, shared):
+    """
+    Ejecuta worker((inicio, fin)) sobre cada shard en el pool de procesos
+    Retorna: lista de resultados en orden de shard
+    """
+    bounds = _shard_bounds(n_items)
+    
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Fork: los workers heredan _SHARED sin copiarlo ni picklearlo
+        _SHARED.update(shared)
+        pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context('fork'))
+    else:
+        pool = ProcessPoolExecutor(max_workers=WORKERS, initializer=_init_shared, initargs=(shared,))
+    
+    try:
+        with pool:
+            return list(pool.map(worker, bounds))
+    finally:
+        _SHARED.clear()
+
+
+def _encode_shard(bounds):
+    """
+    Codifica los items del shard con una sola llamada a json.dumps y les da la
+    indentación de un campo de primer nivel (igual que _encode_json_item item por item)
+    """
+    start, end = bounds
+    text = json.dumps(_SHARED['items'][start:end], indent=2, ensure_ascii=False)
+    # Sacar los corchetes de la lista y correr la indentación un nivel más
+    return '  ' + text[2:-2].replace('\n', '\n  ')
+
+
 # ==================== PHASE 2: REDIRECT RESOLUTION ====================
 
 def resolve_redirects_batch(page_titles):
@@ -222,6 +326,7 @@ def resolve_redirects_batch(page_titles):
             
         except Exception as e:
             print(f"⚠️ Error resolviendo batch: {e}")
+            _API_ERRORS.append(f"redirects: {e}")
         
         time.sleep(RATE_LIMIT_DELAY)
     
@@ -254,9 +359,9 @@ def normalize_graph(graph, redirect_map):
             
             normalized[canonical_source].add(canonical_target)
     
-    # Convertir sets a lists para JSON
-    normalized_graph = {k: list(v) for k, v in normalized.items()}
-    aliases_dict = {k: list(v) for k, v in aliases.items()}
+    # Convertir sets a lists ordenadas para JSON (salida determinística)
+    normalized_graph = {k: sorted(v) for k, v in normalized.items()}
+    aliases_dict = {k: sorted(v) for k, v in aliases.items()}
     
     return normalized_graph, aliases_dict
 
@@ -293,6 +398,7 @@ def check_pages_exist_batch(page_titles):
             
         except Exception as e:
             print(f"⚠️ Error verificando batch: {e}")
+            _API_ERRORS.append(f"existencia: {e}")
         
         time.sleep(RATE_LIMIT_DELAY)
         
@@ -351,6 +457,111 @@ def analyze_missing_pages(graph, existing_pages):
     return confirmed_missing
 
 
+# ==================== PAGE METADATA ====================
+
+def fetch_page_metadata():
+    """
+    Obtiene metadata de todas las páginas en un solo pase batcheado:
+    generator=allpages (BATCH_SIZE páginas por request) con
+    prop=info|categories|pageprops|linkshere, mergeando las continuaciones.
+    Reintenta cada request API_RETRIES veces y si no lo logra lanza RuntimeError.
+    Retorna: {título: {'length', 'touched', 'categories', 'backlinks', 'pageprops'}}
+    """
+    metadata = {}
+    continue_param = {}
+    requests_made = 0
+    
+    print("🔍 Obteniendo metadata de páginas (tamaño, última edición, categorías, backlinks)...")
+    
+    while True:
+        params = {
+            'action': 'query',
+            'generator': 'allpages',
+            'gapnamespace': 0,
+            'gapfilterredir': 'nonredirects',
+            'gaplimit': BATCH_SIZE,
+            'prop': 'info|categories|pageprops|linkshere',
+            'clshow': '!hidden',
+            'cllimit': 'max',
+            'lhprop': 'pageid',
+            'lhnamespace': 0,
+            'lhshow': '!redirect',
+            'lhlimit': 'max',
+            'format': 'json',
+            **continue_param
+        }
+        
+        # Se reintenta con el mismo continue_param; si sigue fallando se aborta
+        # en vez de devolver la wiki a medias
+        for attempt in range(1, API_RETRIES + 1):
+            try:
+                response = requests.get(API_URL, params=params, timeout=10)
+                data = response.json()
+                break
+            except Exception as e:
+                print(f"⚠️ Error obteniendo metadata (intento {attempt}/{API_RETRIES}): {e}")
+                if attempt == API_RETRIES:
+                    raise RuntimeError(
+                        f"Metadata incompleta: falló el request {requests_made + 1} tras {API_RETRIES} intentos"
+                    ) from e
+                time.sleep(RATE_LIMIT_DELAY * 2 ** attempt)
+        
+        requests_made += 1
+        
+        # Con continuación, categories/linkshere de una misma página llegan
+        # repartidos en varias respuestas: se acumulan por título
+        pages = data.get('query', {}).get('pages', {})
+        for page_data in pages.values():
+            title = page_data.get('title')
+            if not title or is_non_english(title):
+                continue
+            
+            entry = metadata.setdefault(title, {
+                'length': 0,
+                'touched': None,
+                'categories': [],
+                'backlinks': 0,
+                'pageprops': {},
+            })
+            if 'length' in page_data:
+                entry['length'] = page_data['length']
+            if 'touched' in page_data:
+                entry['touched'] = page_data['touched']
+            for category in page_data.get('categories', []):
+                entry['categories'].append(category['title'].split(':', 1)[-1])
+            entry['backlinks'] += len(page_data.get('linkshere', []))
+            entry['pageprops'].update(page_data.get('pageprops', {}))
+        
+        if 'continue' in data:
+            continue_param = data['continue']
+        else:
+            break
+        
+        time.sleep(RATE_LIMIT_DELAY)
+    
+    print(f"✅ Metadata de {len(metadata)} páginas en {requests_made} requests\n")
+    return metadata
+
+
+def add_page_metadata(enriched_graph, page_metadata):
+    """Agrega length, touched, categories, backlinks y pageprops a los nodes que existen"""
+    enriched = 0
+    for node in enriched_graph['nodes']:
+        entry = page_metadata.get(node['id'])
+        if entry is None:
+            continue
+        
+        node['length'] = entry['length']
+        node['touched'] = entry['touched']
+        node['categories'] = sorted(set(entry['categories']))
+        node['backlinks'] = entry['backlinks']
+        if entry['pageprops']:
+            node['pageprops'] = entry['pageprops']
+        enriched += 1
+    
+    print(f"📝 Metadata agregada a {enriched}/{len(enriched_graph['nodes'])} nodos")
+
+
 # ==================== PHASE 4: ENRICHED EXPORT ====================
 
 def build_enriched_graph(graph, aliases_dict, missing_pages, existing_pages):
@@ -359,15 +570,16 @@ def build_enriched_graph(graph, aliases_dict, missing_pages, existing_pages):
     """
     nodes = []
     edges = []
+    existing_set = set(existing_pages)
     
-    # Crear nodes
-    all_page_names = set(graph.keys()) | set(missing_pages.keys())
+    # Crear nodes: páginas del grafo y luego las missing, en orden estable
+    all_page_names = dict.fromkeys([*graph, *missing_pages])
     
     for page_name in all_page_names:
         node = {
             'id': page_name,
             'label': page_name,
-            'exists': page_name in existing_pages or page_name in graph,
+            'exists': page_name in existing_set or page_name in graph,
             'aliases': aliases_dict.get(page_name, []),
             'type': 'missing' if page_name in missing_pages else 'canonical'
         }
@@ -403,7 +615,16 @@ def build_enriched_graph(graph, aliases_dict, missing_pages, existing_pages):
 def export_enriched_graph(enriched_graph, filename='remilia_graph_enriched.json'):
     """Exporta el grafo enriquecido"""
     with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(enriched_graph, f, indent=2, ensure_ascii=False)
+        if WORKERS > 1:
+            # Cada worker codifica un chunk de nodes/edges; se escriben en orden
+            sections = [
+                (key, _run_sharded(_encode_shard, len(items), {'items': items}), False)
+                for key, items in enriched_graph.items()
+                if key != 'metadata'
+            ]
+            _write_json_stream(f, enriched_graph['metadata'], sections)
+        else:
+            json.dump(enriched_graph, f, indent=2, ensure_ascii=False)
     
     meta = enriched_graph['metadata']
     print(f"\n✅ Grafo enriquecido exportado a: {filename}")
@@ -448,19 +669,503 @@ def export_legacy_format(normalized_graph, filename='remilia_graph_final.json'):
     print(f"   Edges: {legacy['metadata']['total_edges']}")
 
 
-# ==================== MAIN ====================
+def _encode_json_item(value, key=None):
+    """
+    Codifica un elemento de lista (o un par clave/valor si se pasa key) tal como
+    lo escribiría json.dump(indent=2) dentro de un campo de primer nivel
+    """
+    text = json.dumps(value, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+    if key is not None:
+        text = f"{json.dumps(key, ensure_ascii=False)}: {text}"
+    return '    ' + text
+
+
+def _write_json_stream(f, metadata, sections):
+    """
+    Escribe {'metadata': ..., <secciones>} con el formato exacto de json.dump(indent=2)
+    sin materializar el objeto completo.
+    sections: lista de (clave, items_codificados, es_dict); los items vienen de _encode_json_item
+    """
+    f.write('{\n  "metadata": ')
+    f.write(json.dumps(metadata, indent=2, ensure_ascii=False).replace('\n', '\n  '))
+    
+    for key, encoded_items, is_dict in sections:
+        opening, closing = ('{', '}') if is_dict else ('[', ']')
+        f.write(f",\n  {json.dumps(key, ensure_ascii=False)}: {opening}")
+        
+        empty = True
+        for item in encoded_items:
+            f.write('\n' if empty else ',\n')
+            f.write(item)
+            empty = False
+        
+        f.write(closing if empty else f"\n  {closing}")
+    
+    f.write('\n}')
+
+
+# ==================== RELATED PAGES ====================
+#
+# Similitud entre páginas a partir de la matriz de adyacencia A:
+#   - co-citación (AᵀA): cuántas páginas citan a ambas
+#   - acoplamiento bibliográfico (AAᵀ): cuántas páginas citan ambas
+# Las dos se normalizan por coseno y se promedian. Los productos se hacen
+# con matrices sparse por bloques de filas dimensionados por RELATED_BLOCK_NNZ,
+# así que la RAM queda acotada por el bloque y no por n². Las páginas hub
+# (p.ej. una citada desde casi todas) se ignoran como vecino compartido: no
+# informan similitud y harían que el producto fuera prácticamente denso.
+
+def _row_blocks(work, max_work):
+    """Agrupa filas consecutivas en bloques cuyo trabajo estimado no supera max_work"""
+    blocks = []
+    start = 0
+    cumulative = np.cumsum(work)
+    while start < len(work):
+        done = cumulative[start - 1] if start else 0
+        end = int(np.searchsorted(cumulative, done + max_work, side='right'))
+        end = max(end, start + 1)  # Al menos una fila por bloque
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+def compute_related_pages(titles, edge_pairs, top_k=RELATED_TOP_K,
+                          block_nnz=RELATED_BLOCK_NNZ, max_shared_degree=RELATED_MAX_SHARED_DEGREE):
+    """
+    Calcula las top_k páginas más relacionadas con cada título
+    Retorna: {título: [títulos relacionados, de más a menos similar]}
+    """
+    titles = list(titles)
+    index = {title: i for i, title in enumerate(titles)}
+    
+    # Los targets de un edge pueden no estar en titles: se indexan igual porque
+    # cuentan para la similitud, pero no se recomiendan
+    rows, cols = [], []
+    for source, target in edge_pairs:
+        rows.append(index.setdefault(source, len(index)))
+        cols.append(index.setdefault(target, len(index)))
+    
+    n = len(index)
+    names = list(index)
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(rows)), (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64))),
+        shape=(n, n)
+    )
+    adjacency.data[:] = 1.0  # Edges duplicados cuentan una sola vez
+    
+    # Co-citación: sin fuentes hub; acoplamiento: sin targets hub
+    out_degree = adjacency.getnnz(axis=1)
+    in_degree = adjacency.getnnz(axis=0)
+    cocitation = sparse.diags((out_degree <= max_shared_degree).astype(float)) @ adjacency
+    coupling = adjacency @ sparse.diags((in_degree <= max_shared_degree).astype(float))
+    cocitation.eliminate_zeros()
+    coupling.eliminate_zeros()
+    
+    # Escalar por 1/sqrt(grado) de antemano convierte ambos productos en cosenos
+    cited_count = cocitation.getnnz(axis=0)
+    citing_count = coupling.getnnz(axis=1)
+    in_scale = np.divide(1.0, np.sqrt(cited_count), out=np.zeros(n), where=cited_count > 0)
+    out_scale = np.divide(1.0, np.sqrt(citing_count), out=np.zeros(n), where=citing_count > 0)
+    
+    cited = (cocitation @ sparse.diags(in_scale)).tocsc()   # columnas = páginas citadas
+    citing = (sparse.diags(out_scale) @ coupling).tocsr()   # filas = páginas que citan
+    cited_t = cited.T.tocsr()
+    citing_t = citing.T.tocsc()
+    
+    # Cota de entradas por fila del resultado, para dimensionar los bloques
+    work = (
+        (cited_t[:len(titles)] != 0) @ cocitation.getnnz(axis=1)
+        + (citing[:len(titles)] != 0) @ coupling.getnnz(axis=0)
+    )
+    work = np.minimum(work, n)
+    
+    related = {}
+    for start, end in _row_blocks(work, block_nnz):
+        similarity = (cited_t[start:end] @ cited + citing[start:end] @ citing_t) * 0.5
+        similarity = similarity.tocoo()
+        
+        # Descartar la propia página y los targets que no son nodes (no se
+        # pueden seleccionar en el frontend); redondear para que empates
+        # exactos no dependan del float
+        keep = (similarity.row + start != similarity.col) & (similarity.col < len(titles))
+        row, col = similarity.row[keep], similarity.col[keep]
+        score = np.round(similarity.data[keep], 9)
+        
+        # Orden por fila, luego score descendente, luego índice (desempate estable)
+        order = np.lexsort((col, -score, row))
+        row, col = row[order], col[order]
+        
+        # Posición de cada entrada dentro de su fila → quedarse con las top_k
+        row_start = np.searchsorted(row, np.arange(end - start))
+        rank = np.arange(len(row)) - row_start[row]
+        keep = rank < top_k
+        row, col = row[keep], col[keep]
+        
+        bounds = np.searchsorted(row, np.arange(end - start + 1))
+        for offset in range(end - start):
+            related[titles[start + offset]] = [
+                names[j] for j in col[bounds[offset]:bounds[offset + 1]]
+            ]
+    
+    return related
+
+
+def add_related_pages(enriched_graph, top_k=RELATED_TOP_K):
+    """Agrega a cada node el atributo 'related' con sus top_k páginas relacionadas"""
+    nodes = enriched_graph['nodes']
+    related = compute_related_pages(
+        (node['id'] for node in nodes),
+        ((edge['source'], edge['target']) for edge in enriched_graph['edges']),
+        top_k=top_k
+    )
+    for node in nodes:
+        node['related'] = related[node['id']]
+    
+    with_related = sum(1 for node in nodes if node['related'])
+    print(f"🔗 Related pages calculadas para {with_related}/{len(nodes)} nodos (top {top_k})")
+
+
+# ==================== MODO DISCO (EXTERNAL MEMORY) ====================
+#
+# Para wikis cuyo grafo no cabe en RAM: los links crawleados se agregan a un
+# edge store SQLite y la normalización, el conteo de missing pages y el export
+# se hacen como joins/sorts de SQLite (que derrama a disco cuando supera su
+# caché). En memoria solo viven los links de la página actual y lotes acotados.
+
+def open_edge_store(path=EDGE_STORE_PATH):
+    """Crea un edge store vacío en disco y lo configura según MEMORY_BUDGET_MB"""
+    if os.path.exists(path):
+        os.remove(path)
+    
+    conn = sqlite3.connect(path)
+    budget_kib = MEMORY_BUDGET_MB * 1024
+    
+    # La mitad del presupuesto para la caché de páginas; el resto queda para
+    # sorts temporales (que van a archivo) y los lotes del lado Python
+    conn.execute(f"PRAGMA cache_size = -{budget_kib // 2}")
+    conn.execute("PRAGMA temp_store = FILE")
+    conn.execute(f"PRAGMA soft_heap_limit = {budget_kib * 1024}")
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    
+    conn.executescript("""
+        CREATE TABLE pages (title TEXT PRIMARY KEY) WITHOUT ROWID;
+        CREATE TABLE raw_edges (source TEXT NOT NULL, target TEXT NOT NULL);
+        CREATE TABLE names (title TEXT PRIMARY KEY) WITHOUT ROWID;
+        CREATE TABLE redirects (name TEXT PRIMARY KEY, canonical TEXT NOT NULL) WITHOUT ROWID;
+        CREATE TABLE edges (
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            PRIMARY KEY (source, target)
+        ) WITHOUT ROWID;
+        CREATE TABLE aliases (
+            canonical TEXT NOT NULL,
+            alias TEXT NOT NULL,
+            PRIMARY KEY (canonical, alias)
+        ) WITHOUT ROWID;
+        CREATE TABLE candidates (title TEXT PRIMARY KEY, refs INTEGER NOT NULL) WITHOUT ROWID;
+        CREATE TABLE missing (title TEXT PRIMARY KEY, refs INTEGER NOT NULL) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def _flush_rows():
+    """Filas a acumular en Python antes de escribirlas (~1/4 del presupuesto)"""
+    return max(1000, MEMORY_BUDGET_MB * 1024 * 1024 // 4 // 256)
+
+
+def _iter_chunks(conn, table, size, columns='title'):
+    """Recorre una tabla ordenada por title en lotes de `size` filas (keyset pagination)"""
+    last = ''
+    while True:
+        rows = conn.execute(
+            f"SELECT {columns} FROM {table} WHERE title > ? ORDER BY title LIMIT ?",
+            (last, size)
+        ).fetchall()
+        if not rows:
+            break
+        yield rows
+        last = rows[-1][0]
+
+
+def discover_pages_to_disk(conn):
+    """Phase 1a: guarda en disco la lista de páginas existentes"""
+    print("🔍 Phase 1: Descubriendo páginas de la wiki...")
+    
+    batch = []
+    for title in iter_all_wiki_pages():
+        batch.append((title,))
+        if len(batch) >= _flush_rows():
+            conn.executemany("INSERT OR IGNORE INTO pages VALUES (?)", batch)
+            batch = []
+    conn.executemany("INSERT OR IGNORE INTO pages VALUES (?)", batch)
+    conn.commit()
+    
+    total = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    print(f"✅ Total páginas encontradas: {total}\n")
+    return total
+
+
+def crawl_wiki_to_disk(conn, verbose=True):
+    """Crawlea la wiki agregando los links filtrados a raw_edges"""
+    total_pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    stats = {
+        'total_pages': total_pages,
+        'total_raw_links': 0,
+        'total_filtered_links': 0,
+    }
+    
+    print(f"🚀 Crawleando {total_pages} páginas (modo disco)...\n")
+    
+    i = 0
+    buffered = []
+    for rows in _iter_chunks(conn, 'pages', BATCH_SIZE):
+        for (page,) in rows:
+            i += 1
+            if verbose:
+                print(f"[{i}/{total_pages}] {page}")
+            
+            raw_links = get_page_links_api(page)
+            stats['total_raw_links'] += len(raw_links)
+            
+            filtered_links = filter_links(raw_links, verbose=verbose)
+            stats['total_filtered_links'] += len(filtered_links)
+            
+            buffered.extend((page, link) for link in filtered_links)
+            if len(buffered) >= _flush_rows():
+                conn.executemany("INSERT INTO raw_edges VALUES (?, ?)", buffered)
+                conn.commit()
+                buffered = []
+            
+            if verbose:
+                print(f"  └─ {len(raw_links)} raw → {len(filtered_links)} filtrados\n")
+            
+            time.sleep(RATE_LIMIT_DELAY)
+    
+    conn.executemany("INSERT INTO raw_edges VALUES (?, ?)", buffered)
+    conn.commit()
+    
+    return stats
+
+
+def resolve_redirects_to_disk(conn):
+    """Phase 2a: resuelve redirects de todos los nombres únicos y los guarda en disco"""
+    conn.execute("""
+        INSERT OR IGNORE INTO names
+        SELECT title FROM pages UNION SELECT target FROM raw_edges
+    """)
+    conn.commit()
+    
+    total = conn.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+    print(f"🔍 Resolviendo redirects para {total} nombres únicos...")
+    
+    # resolve_redirects_batch ya agrupa de a BATCH_SIZE; acá solo acotamos la RAM
+    for rows in _iter_chunks(conn, 'names', BATCH_SIZE * 20):
+        redirect_map = resolve_redirects_batch([title for (title,) in rows])
+        conn.executemany("INSERT OR REPLACE INTO redirects VALUES (?, ?)", redirect_map.items())
+        conn.commit()
+    
+    return conn.execute(
+        "SELECT COUNT(*) FROM redirects WHERE name != canonical"
+    ).fetchone()[0]
+
+
+def normalize_graph_on_disk(conn):
+    """
+    Equivalente a normalize_graph como joins de SQLite:
+    edges = raw_edges con source/target canónicos (deduplicados por la PK)
+    """
+    conn.execute("""
+        INSERT OR IGNORE INTO edges
+        SELECT COALESCE(rs.canonical, e.source), COALESCE(rt.canonical, e.target)
+        FROM raw_edges e
+        LEFT JOIN redirects rs ON rs.name = e.source
+        LEFT JOIN redirects rt ON rt.name = e.target
+    """)
+    
+    # Aliases: páginas crawleadas y targets que eran redirects
+    conn.execute("""
+        INSERT OR IGNORE INTO aliases
+        SELECT r.canonical, r.name
+        FROM redirects r
+        WHERE r.name != r.canonical
+          AND (r.name IN (SELECT title FROM pages) OR r.name IN (SELECT target FROM raw_edges))
+    """)
+    conn.commit()
+    
+    return conn.execute("SELECT COUNT(DISTINCT canonical) FROM aliases").fetchone()[0]
+
+
+def analyze_missing_pages_on_disk(conn):
+    """Equivalente a analyze_missing_pages: cuenta referencias con GROUP BY y verifica por lotes"""
+    conn.execute("""
+        INSERT INTO candidates
+        SELECT target, COUNT(*) FROM edges
+        WHERE target NOT IN (SELECT title FROM pages)
+        GROUP BY target
+    """)
+    conn.commit()
+    
+    total = conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0]
+    print(f"📊 Encontradas {total} páginas potencialmente missing")
+    
+    exist_but_not_crawled = []
+    for rows in _iter_chunks(conn, 'candidates', BATCH_SIZE * 20, columns='title, refs'):
+        existence_map = check_pages_exist_batch([title for title, _ in rows])
+        conn.executemany(
+            "INSERT INTO missing VALUES (?, ?)",
+            [(title, refs) for title, refs in rows if not existence_map.get(title, False)]
+        )
+        conn.commit()
+        
+        if len(exist_but_not_crawled) < 5:
+            exist_but_not_crawled.extend(
+                title for title, _ in rows if existence_map.get(title, False)
+            )
+    
+    confirmed = conn.execute("SELECT COUNT(*) FROM missing").fetchone()[0]
+    
+    # Páginas que existen pero no crawleamos (edge case)
+    not_crawled = total - confirmed
+    if not_crawled:
+        print(f"⚠️ {not_crawled} páginas existen pero no fueron crawleadas:")
+        for page in exist_but_not_crawled[:5]:
+            print(f"    - {page}")
+        if not_crawled > 5:
+            print(f"    ... y {not_crawled - 5} más")
+        print()
+    
+    return confirmed
+
+
+def export_enriched_graph_from_disk(conn, filename='remilia_graph_enriched.json'):
+    """Equivalente a build_enriched_graph + export_enriched_graph, streameando desde disco"""
+    node_query = """
+        SELECT n.title,
+               EXISTS (SELECT 1 FROM pages p WHERE p.title = n.title)
+                   OR EXISTS (SELECT 1 FROM edges e WHERE e.source = n.title),
+               EXISTS (SELECT 1 FROM missing m WHERE m.title = n.title)
+        FROM (SELECT source AS title FROM edges UNION SELECT title FROM missing) n
+        ORDER BY n.title
+    """
+    
+    total_nodes = 0
+    existing_nodes = 0
+    for title, exists, _ in conn.execute(node_query):
+        total_nodes += 1
+        existing_nodes += bool(exists)
+    
+    metadata = {
+        'total_nodes': total_nodes,
+        'existing_nodes': existing_nodes,
+        'missing_nodes': conn.execute("SELECT COUNT(*) FROM missing").fetchone()[0],
+        'total_edges': conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0],
+        'redirects_resolved': conn.execute("SELECT COUNT(*) FROM aliases").fetchone()[0],
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    def encoded_nodes():
+        for title, exists, is_missing in conn.execute(node_query):
+            aliases = [alias for (alias,) in conn.execute(
+                "SELECT alias FROM aliases WHERE canonical = ? ORDER BY alias", (title,)
+            )]
+            yield _encode_json_item({
+                'id': title,
+                'label': title,
+                'exists': bool(exists),
+                'aliases': aliases,
+                'type': 'missing' if is_missing else 'canonical'
+            })
+    
+    def encoded_edges():
+        for source, target in conn.execute("SELECT source, target FROM edges ORDER BY source, target"):
+            yield _encode_json_item({'source': source, 'target': target})
+    
+    with open(filename, 'w', encoding='utf-8') as f:
+        _write_json_stream(f, metadata, [
+            ('nodes', encoded_nodes(), False),
+            ('edges', encoded_edges(), False),
+        ])
+    
+    print(f"\n✅ Grafo enriquecido exportado a: {filename}")
+    print(f"   Nodos totales: {metadata['total_nodes']}")
+    print(f"   Nodos existentes: {metadata['existing_nodes']}")
+    print(f"   Nodos missing: {metadata['missing_nodes']}")
+    print(f"   Edges: {metadata['total_edges']}")
+    print(f"   Redirects resueltos: {metadata['redirects_resolved']}")
+    
+    return metadata
+
+
+def export_missing_pages_from_disk(conn, filename='missing_pages_analysis.json'):
+    """Equivalente a export_missing_pages, streameando desde disco"""
+    total = 0
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for title, refs in conn.execute("SELECT title, refs FROM missing ORDER BY title"):
+            f.write(',\n  ' if total else '\n  ')
+            f.write(f"{json.dumps(title, ensure_ascii=False)}: {refs}")
+            total += 1
+        f.write('\n}' if total else '}')
+    
+    print(f"\n✅ Páginas missing exportadas a: {filename}")
+    print(f"   Total: {total} páginas confirmadas como red links")
+    
+    if total:
+        print(f"\n   🔗 Top 10 más referenciadas:")
+        for page, count in conn.execute(
+            "SELECT title, refs FROM missing ORDER BY refs DESC, title LIMIT 10"
+        ):
+            print(f"      {count:3d}x → {page}")
+
+
+def export_legacy_format_from_disk(conn, filename='remilia_graph_final.json'):
+    """Equivalente a export_legacy_format, streameando desde disco"""
+    metadata = {
+        'total_nodes': conn.execute("SELECT COUNT(DISTINCT source) FROM edges").fetchone()[0],
+        'total_edges': conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0],
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    
+    def encoded_graph():
+        current, targets = None, []
+        for source, target in conn.execute("SELECT source, target FROM edges ORDER BY source, target"):
+            if source != current and current is not None:
+                yield _encode_json_item(targets, key=current)
+                targets = []
+            current = source
+            targets.append(target)
+        if current is not None:
+            yield _encode_json_item(targets, key=current)
+    
+    with open(filename, 'w', encoding='utf-8') as f:
+        _write_json_stream(f, metadata, [('graph', encoded_graph(), True)])
+    
+    print(f"\n✅ Formato legacy exportado a: {filename}")
+    print(f"   Nodos: {metadata['total_nodes']}")
+    print(f"   Edges: {metadata['total_edges']}")
 
-def main():
+
+def main_disk():
+    """
+    Pipeline completo en modo disco (RAM acotada por MEMORY_BUDGET_MB).
+    No calcula related pages (necesitan la matriz de adyacencia completa en RAM)
+    ni metadata de páginas (fetch_page_metadata acumula toda la wiki en un dict).
+    """
     print("🌐 REMILIA WIKI GRAPH CRAWLER v2")
     print("="*60)
-    print("Modo: COMPLETO (con redirects y verificación de missing)\n")
+    print(f"Modo: DISCO (edge store: {EDGE_STORE_PATH}, presupuesto: {MEMORY_BUDGET_MB} MB)")
+    print("   Sin related pages ni metadata de páginas (solo en modo memoria)\n")
+    
+    conn = open_edge_store(EDGE_STORE_PATH)
+    del _API_ERRORS[:]
     
     # PHASE 1: Crawl básico
     print("="*60)
     print("PHASE 1: CRAWL BÁSICO")
     print("="*60)
-    existing_pages = get_all_wiki_pages()
-    graph, stats = crawl_wiki(existing_pages, verbose=False)
+    discover_pages_to_disk(conn)
+    stats = crawl_wiki_to_disk(conn, verbose=False)
     
     print(f"\n📊 Estadísticas del crawl:")
     print(f"   Páginas crawleadas: {stats['total_pages']}")
@@ -471,6 +1176,460 @@ def main():
     print("\n" + "="*60)
     print("PHASE 2: RESOLUCIÓN DE REDIRECTS")
     print("="*60)
+    redirects_found = resolve_redirects_to_disk(conn)
+    aliased_pages = normalize_graph_on_disk(conn)
+    print(f"✅ Redirects encontrados: {redirects_found}")
+    print(f"✅ Aliases guardados para {aliased_pages} páginas")
+    
+    # PHASE 3: Verificación de missing pages
+    print("\n" + "="*60)
+    print("PHASE 3: VERIFICACIÓN DE MISSING PAGES")
+    print("="*60)
+    confirmed = analyze_missing_pages_on_disk(conn)
+    print(f"✅ Missing pages confirmadas: {confirmed}")
+    
+    # PHASE 4: Export enriquecido
+    print("\n" + "="*60)
+    print("PHASE 4: EXPORT")
+    print("="*60)
+    metadata = export_enriched_graph_from_disk(conn)
+    export_missing_pages_from_disk(conn)
+    export_legacy_format_from_disk(conn)
+    
+    if SNAPSHOT_STORE_PATH:
+        if _API_ERRORS:
+            # Un grafo parcial metería bajas y altas falsas en el historial
+            print(f"\n⚠️  {len(_API_ERRORS)} errores de API: la corrida no se guarda en el historial")
+        else:
+            append_snapshot_from_disk(conn, metadata, SNAPSHOT_STORE_PATH)
+    
+    conn.close()
+    
+    print("\n✨ Done!")
+    print("="*60)
+
+
+# ==================== SNAPSHOT STORE ====================
+#
+# Cada corrida se agrega a un store SQLite compacto:
+#   - titles: tabla de títulos internados (id entero por título)
+#   - snapshots: metadata + nodes, missing y edges como arrays ordenados de
+#     enteros, delta-encoded y comprimidos con zlib. Un edge es
+#     (id_source << 32) | id_target
+#   - degrees: grados por nodo, solo en los snapshots donde cambiaron
+# diff() y graph_at() decodifican solo los snapshots pedidos y
+# degree_series() es una consulta indexada, sin cargar ningún snapshot.
+
+def open_snapshot_store(path=SNAPSHOT_STORE_PATH):
+    """Abre (o crea) el snapshot store"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS titles (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            nodes BLOB NOT NULL,
+            missing BLOB NOT NULL,
+            edges BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS snapshots_timestamp ON snapshots (timestamp);
+        CREATE TABLE IF NOT EXISTS degrees (
+            title_id INTEGER NOT NULL,
+            snapshot_id INTEGER NOT NULL,
+            out_degree INTEGER NOT NULL,
+            in_degree INTEGER NOT NULL,
+            PRIMARY KEY (title_id, snapshot_id)
+        ) WITHOUT ROWID;
+    """)
+    return conn
+
+
+def _pack_ids(sorted_ids, typecode, chunk_size=65536):
+    """
+    Enteros ordenados → deltas little-endian comprimidos. Consume el iterable
+    por chunks, así que puede alimentarse directo de un cursor SQLite
+    """
+    compressor = zlib.compressobj(9)
+    blob = []
+    previous = 0
+    iterator = iter(sorted_ids)
+    
+    while True:
+        chunk = array(typecode, islice(iterator, chunk_size))
+        if not chunk:
+            break
+        for i in range(len(chunk)):
+            chunk[i], previous = chunk[i] - previous, chunk[i]
+        if sys.byteorder == 'big':
+            chunk.byteswap()
+        blob.append(compressor.compress(chunk.tobytes()))
+    
+    blob.append(compressor.flush())
+    return b''.join(blob)
+
+
+def _unpack_ids(blob, typecode):
+    """Inverso de _pack_ids"""
+    values = array(typecode)
+    values.frombytes(zlib.decompress(blob))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    for i in range(1, len(values)):
+        values[i] += values[i - 1]
+    return values
+
+
+def _intern_titles(conn, titles):
+    """Asigna un id entero a cada título (creándolo si es nuevo); retorna {título: id}"""
+    conn.executemany("INSERT OR IGNORE INTO titles (title) VALUES (?)", ((t,) for t in titles))
+    return {title: title_id for title_id, title in conn.execute("SELECT id, title FROM titles")}
+
+
+def _titles_by_id(conn, ids):
+    """Traduce ids a títulos consultando solo los ids pedidos"""
+    ids = list(ids)
+    names = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i+500]
+        placeholders = ','.join('?' * len(chunk))
+        names.update(conn.execute(f"SELECT id, title FROM titles WHERE id IN ({placeholders})", chunk))
+    return names
+
+
+def _degrees(edge_keys):
+    """Calcula {title_id: (out_degree, in_degree)} a partir de edge keys"""
+    out_degree = defaultdict(int)
+    in_degree = defaultdict(int)
+    for key in edge_keys:
+        out_degree[key >> 32] += 1
+        in_degree[key & 0xFFFFFFFF] += 1
+    return {
+        title_id: (out_degree.get(title_id, 0), in_degree.get(title_id, 0))
+        for title_id in set(out_degree) | set(in_degree)
+    }
+
+
+def append_snapshot(conn, metadata, node_titles, missing_titles, edge_pairs):
+    """
+    Agrega una corrida al store. Si el grafo no cambió respecto del último
+    snapshot no se guarda nada nuevo.
+    Retorna: id del snapshot
+    """
+    node_titles = list(node_titles)
+    missing_titles = list(missing_titles)
+    edge_pairs = list(edge_pairs)
+    
+    # Los targets de un edge no siempre son nodes (páginas existentes sin links salientes)
+    ids = _intern_titles(conn, [*node_titles, *(title for pair in edge_pairs for title in pair)])
+    node_ids = sorted(ids[t] for t in node_titles)
+    missing_ids = sorted(ids[t] for t in missing_titles)
+    edge_keys = sorted((ids[source] << 32) | ids[target] for source, target in edge_pairs)
+    
+    nodes_blob = _pack_ids(node_ids, 'I')
+    missing_blob = _pack_ids(missing_ids, 'I')
+    edges_blob = _pack_ids(edge_keys, 'Q')
+    
+    previous = conn.execute(
+        "SELECT id, nodes, missing, edges FROM snapshots ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    if previous and previous[1:] == (nodes_blob, missing_blob, edges_blob):
+        conn.commit()
+        print(f"\n📸 Sin cambios respecto del snapshot #{previous[0]}")
+        return previous[0]
+    
+    snapshot_id = conn.execute(
+        "INSERT INTO snapshots (timestamp, metadata, nodes, missing, edges) VALUES (?, ?, ?, ?, ?)",
+        (metadata['timestamp'], json.dumps(metadata, ensure_ascii=False), nodes_blob, missing_blob, edges_blob)
+    ).lastrowid
+    
+    # Solo se guardan los grados que cambiaron (incluye nodos que pasan a 0)
+    current = _degrees(edge_keys)
+    before = _degrees(_unpack_ids(previous[3], 'Q')) if previous else {}
+    changed = [
+        (title_id, snapshot_id, *current.get(title_id, (0, 0)))
+        for title_id in set(current) | set(before)
+        if current.get(title_id, (0, 0)) != before.get(title_id, (0, 0))
+    ]
+    conn.executemany("INSERT INTO degrees VALUES (?, ?, ?, ?)", changed)
+    conn.commit()
+    
+    print(f"\n📸 Snapshot #{snapshot_id} guardado ({len(edges_blob):,} bytes de edges, {len(changed)} grados cambiados)")
+    return snapshot_id
+
+
+def append_snapshot_from_disk(edge_conn, metadata, path=SNAPSHOT_STORE_PATH):
+    """
+    Equivalente a append_snapshot para el modo disco: el store se adjunta al
+    edge store y el interning, los arrays ordenados y el diff de grados se
+    resuelven en SQLite, sin cargar títulos ni edges en memoria
+    Retorna: id del snapshot
+    """
+    open_snapshot_store(path).close()  # Crea el schema si hace falta
+    
+    conn = edge_conn
+    conn.commit()
+    conn.execute("ATTACH DATABASE ? AS store", (path,))
+    
+    # Los targets de un edge no siempre son nodes (páginas existentes sin links salientes)
+    conn.execute("""
+        INSERT OR IGNORE INTO store.titles (title)
+        SELECT source FROM edges UNION SELECT target FROM edges UNION SELECT title FROM missing
+    """)
+    
+    nodes_blob = _pack_ids((title_id for (title_id,) in conn.execute("""
+        SELECT t.id FROM (SELECT source AS title FROM edges UNION SELECT title FROM missing) n
+        JOIN store.titles t ON t.title = n.title
+        ORDER BY t.id
+    """)), 'I')
+    missing_blob = _pack_ids((title_id for (title_id,) in conn.execute("""
+        SELECT t.id FROM missing m JOIN store.titles t ON t.title = m.title ORDER BY t.id
+    """)), 'I')
+    edges_blob = _pack_ids((key for (key,) in conn.execute("""
+        SELECT (s.id << 32) | t.id AS key
+        FROM edges e
+        JOIN store.titles s ON s.title = e.source
+        JOIN store.titles t ON t.title = e.target
+        ORDER BY key
+    """)), 'Q')
+    
+    previous = conn.execute(
+        "SELECT id, nodes, missing, edges FROM store.snapshots ORDER BY id DESC LIMIT 1"
+    ).fetchone()
+    if previous and previous[1:] == (nodes_blob, missing_blob, edges_blob):
+        conn.commit()
+        conn.execute("DETACH DATABASE store")
+        print(f"\n📸 Sin cambios respecto del snapshot #{previous[0]}")
+        return previous[0]
+    
+    snapshot_id = conn.execute(
+        "INSERT INTO store.snapshots (timestamp, metadata, nodes, missing, edges) VALUES (?, ?, ?, ?, ?)",
+        (metadata['timestamp'], json.dumps(metadata, ensure_ascii=False), nodes_blob, missing_blob, edges_blob)
+    ).lastrowid
+    
+    # Grados actuales vs. el último grado guardado de cada título (la tabla
+    # degrees solo tiene cambios); se insertan solo los que cambiaron
+    conn.executescript("""
+        DROP TABLE IF EXISTS temp.current_degrees;
+        DROP TABLE IF EXISTS temp.previous_degrees;
+        CREATE TEMP TABLE current_degrees AS
+            SELECT title_id, SUM(out_degree) AS out_degree, SUM(in_degree) AS in_degree
+            FROM (
+                SELECT s.id AS title_id, 1 AS out_degree, 0 AS in_degree
+                FROM edges e JOIN store.titles s ON s.title = e.source
+                UNION ALL
+                SELECT t.id, 0, 1
+                FROM edges e JOIN store.titles t ON t.title = e.target
+            )
+            GROUP BY title_id;
+        CREATE TEMP TABLE previous_degrees AS
+            SELECT d.title_id, d.out_degree, d.in_degree
+            FROM store.degrees d
+            JOIN (
+                SELECT title_id, MAX(snapshot_id) AS snapshot_id FROM store.degrees GROUP BY title_id
+            ) latest ON latest.title_id = d.title_id AND latest.snapshot_id = d.snapshot_id;
+    """)
+    changed = conn.execute("""
+        INSERT INTO store.degrees
+        SELECT c.title_id, ?, c.out_degree, c.in_degree
+        FROM current_degrees c LEFT JOIN previous_degrees p ON p.title_id = c.title_id
+        WHERE p.title_id IS NULL OR p.out_degree != c.out_degree OR p.in_degree != c.in_degree
+        UNION ALL
+        SELECT p.title_id, ?, 0, 0
+        FROM previous_degrees p LEFT JOIN current_degrees c ON c.title_id = p.title_id
+        WHERE c.title_id IS NULL AND (p.out_degree != 0 OR p.in_degree != 0)
+    """, (snapshot_id, snapshot_id)).rowcount
+    conn.commit()
+    conn.executescript("DROP TABLE temp.current_degrees; DROP TABLE temp.previous_degrees;")
+    conn.execute("DETACH DATABASE store")
+    
+    print(f"\n📸 Snapshot #{snapshot_id} guardado ({len(edges_blob):,} bytes de edges, {changed} grados cambiados)")
+    return snapshot_id
+
+
+def record_snapshot(enriched_graph, path=SNAPSHOT_STORE_PATH):
+    """Agrega el grafo enriquecido de esta corrida al snapshot store"""
+    conn = open_snapshot_store(path)
+    try:
+        return append_snapshot(
+            conn,
+            enriched_graph['metadata'],
+            (node['id'] for node in enriched_graph['nodes']),
+            (node['id'] for node in enriched_graph['nodes'] if node['type'] == 'missing'),
+            ((edge['source'], edge['target']) for edge in enriched_graph['edges'])
+        )
+    finally:
+        conn.close()
+
+
+def list_snapshots(conn):
+    """Retorna [(id, timestamp, metadata), ...] en orden cronológico"""
+    return [
+        (snapshot_id, timestamp, json.loads(metadata))
+        for snapshot_id, timestamp, metadata in conn.execute(
+            "SELECT id, timestamp, metadata FROM snapshots ORDER BY id"
+        )
+    ]
+
+
+def _snapshot_at(conn, t):
+    """Último snapshot con timestamp <= t ('YYYY-MM-DD HH:MM:SS' o prefijo); None = el más reciente"""
+    if t is None:
+        row = conn.execute("SELECT id FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+    else:
+        # Un prefijo como '2026-03' cubre todo ese mes
+        row = conn.execute(
+            "SELECT id FROM snapshots WHERE substr(timestamp, 1, ?) <= ? ORDER BY timestamp DESC, id DESC LIMIT 1",
+            (len(t), t)
+        ).fetchone()
+    if row is None:
+        raise ValueError(f"No hay snapshots en o antes de {t}")
+    return row[0]
+
+
+def graph_at(conn, t=None):
+    """
+    Reconstruye el grafo tal como estaba en el momento t
+    Retorna: {'metadata', 'nodes', 'missing', 'graph': {source: [targets]}}
+    """
+    snapshot_id = _snapshot_at(conn, t)
+    metadata, nodes_blob, missing_blob, edges_blob = conn.execute(
+        "SELECT metadata, nodes, missing, edges FROM snapshots WHERE id = ?", (snapshot_id,)
+    ).fetchone()
+    
+    node_ids = _unpack_ids(nodes_blob, 'I')
+    edge_keys = _unpack_ids(edges_blob, 'Q')
+    
+    involved = set(node_ids)
+    for key in edge_keys:
+        involved.update((key >> 32, key & 0xFFFFFFFF))
+    names = _titles_by_id(conn, involved)
+    
+    graph = defaultdict(list)
+    for key in edge_keys:
+        graph[names[key >> 32]].append(names[key & 0xFFFFFFFF])
+    
+    return {
+        'metadata': json.loads(metadata),
+        'nodes': sorted(names[i] for i in node_ids),
+        'missing': sorted(names[i] for i in _unpack_ids(missing_blob, 'I')),
+        'graph': {source: sorted(targets) for source, targets in sorted(graph.items())}
+    }
+
+
+def diff(conn, t1, t2=None):
+    """
+    Compara el grafo en t1 con el grafo en t2 (por defecto, el más reciente)
+    Retorna: {'added_nodes', 'removed_nodes', 'added_edges', 'removed_edges'}
+    """
+    def load(t):
+        nodes_blob, edges_blob = conn.execute(
+            "SELECT nodes, edges FROM snapshots WHERE id = ?", (_snapshot_at(conn, t),)
+        ).fetchone()
+        return set(_unpack_ids(nodes_blob, 'I')), set(_unpack_ids(edges_blob, 'Q'))
+    
+    nodes_1, edges_1 = load(t1)
+    nodes_2, edges_2 = load(t2)
+    
+    added_edges = edges_2 - edges_1
+    removed_edges = edges_1 - edges_2
+    added_nodes = nodes_2 - nodes_1
+    removed_nodes = nodes_1 - nodes_2
+    
+    # Solo se traducen los títulos involucrados en el diff
+    involved = added_nodes | removed_nodes
+    for key in added_edges | removed_edges:
+        involved.update((key >> 32, key & 0xFFFFFFFF))
+    names = _titles_by_id(conn, involved)
+    
+    def edge_list(keys):
+        return sorted((names[key >> 32], names[key & 0xFFFFFFFF]) for key in keys)
+    
+    return {
+        'added_nodes': sorted(names[i] for i in added_nodes),
+        'removed_nodes': sorted(names[i] for i in removed_nodes),
+        'added_edges': edge_list(added_edges),
+        'removed_edges': edge_list(removed_edges),
+    }
+
+
+def degree_series(conn, title):
+    """
+    Serie temporal de grados de una página
+    Retorna: [(timestamp, out_degree, in_degree), ...] con un punto por snapshot
+    """
+    row = conn.execute("SELECT id FROM titles WHERE title = ?", (title,)).fetchone()
+    changes = {}
+    if row:
+        changes = {
+            snapshot_id: (out_degree, in_degree)
+            for snapshot_id, out_degree, in_degree in conn.execute(
+                "SELECT snapshot_id, out_degree, in_degree FROM degrees WHERE title_id = ?", (row[0],)
+            )
+        }
+    
+    series = []
+    current = (0, 0)
+    for snapshot_id, timestamp in conn.execute("SELECT id, timestamp FROM snapshots ORDER BY id"):
+        current = changes.get(snapshot_id, current)
+        series.append((timestamp, *current))
+    return series
+
+
+# ==================== PIPELINE ====================
+#
+# Las cuatro fases son etapas declarativas. El output de cada etapa se
+# guarda en PIPELINE_CACHE_DIR con una clave = hash(nombre, config de la
+# etapa, hash del contenido de sus inputs). Al re-correr, una etapa solo se
+# recalcula si su clave cambió; si un output upstream sale idéntico, las
+# etapas de abajo siguen sirviéndose de caché. Las etapas que consultan la
+# wiki guardan además la revisión de la wiki con la que se calcularon (el
+# último rcid de recentchanges): si la wiki cambió desde entonces, su caché
+# se considera vieja y se recalculan.
+
+def get_wiki_revision():
+    """
+    Último rcid de la wiki (cambia con cada edición, alta, borrado o movida)
+    Retorna: int, o None si no se pudo consultar
+    """
+    params = {
+        'action': 'query',
+        'list': 'recentchanges',
+        'rcprop': 'ids',
+        'rclimit': 1,
+        'format': 'json'
+    }
+    
+    try:
+        response = requests.get(API_URL, params=params, timeout=10)
+        changes = response.json()['query']['recentchanges']
+        # Sin cambios recientes (fuera de la ventana de recentchanges): nada cambió
+        return changes[0]['rcid'] if changes else 0
+    except Exception as e:
+        print(f"⚠️ No se pudo consultar la última revisión de la wiki: {e}")
+        return None
+
+
+def stage_crawl(inputs, degraded):
+    """PHASE 1: Crawl básico"""
+    existing_pages = get_all_wiki_pages()
+    graph, stats = crawl_wiki(existing_pages, verbose=False)
+    
+    print(f"\n📊 Estadísticas del crawl:")
+    print(f"   Páginas crawleadas: {stats['total_pages']}")
+    print(f"   Links raw: {stats['total_raw_links']}")
+    print(f"   Links filtrados: {stats['total_filtered_links']}")
+    
+    return {'existing_pages': existing_pages, 'graph': graph, 'stats': stats}
+
+
+def stage_redirects(inputs, degraded):
+    """PHASE 2: Resolución de redirects"""
+    existing_pages = inputs['crawl']['existing_pages']
+    graph = inputs['crawl']['graph']
     
     # Recopilar todos los nombres únicos
     all_page_names = set(existing_pages)
@@ -478,7 +1637,7 @@ def main():
         all_page_names.update(targets)
     
     print(f"🔍 Resolviendo redirects para {len(all_page_names)} nombres únicos...")
-    redirect_map = resolve_redirects_batch(list(all_page_names))
+    redirect_map = resolve_redirects_batch(sorted(all_page_names))
     
     # Normalizar grafo
     normalized_graph, aliases_dict = normalize_graph(graph, redirect_map)
@@ -487,30 +1646,277 @@ def main():
     print(f"✅ Redirects encontrados: {redirects_found}")
     print(f"✅ Aliases guardados para {len(aliases_dict)} páginas")
     
-    # PHASE 3: Verificación de missing pages
-    print("\n" + "="*60)
-    print("PHASE 3: VERIFICACIÓN DE MISSING PAGES")
-    print("="*60)
-    
-    missing_pages = analyze_missing_pages(normalized_graph, existing_pages)
+    return {'normalized_graph': normalized_graph, 'aliases_dict': aliases_dict}
+
+
+def stage_missing(inputs, degraded):
+    """PHASE 3: Verificación de missing pages"""
+    missing_pages = analyze_missing_pages(
+        inputs['redirects']['normalized_graph'],
+        inputs['crawl']['existing_pages']
+    )
     
     print(f"✅ Missing pages confirmadas: {len(missing_pages)}")
     
-    # PHASE 4: Export enriquecido
-    print("\n" + "="*60)
-    print("PHASE 4: EXPORT")
-    print("="*60)
+    return {'missing_pages': missing_pages}
+
+
+def stage_metadata(inputs, degraded):
+    """Metadata de páginas (tamaño, última edición, categorías, backlinks)"""
+    return {'page_metadata': fetch_page_metadata()}
+
+
+def stage_export(inputs, degraded):
+    """
+    PHASE 4: Export enriquecido
+    degraded: algún input salió con errores de API (no se guarda en el historial)
+    """
+    normalized_graph = inputs['redirects']['normalized_graph']
+    missing_pages = inputs['missing']['missing_pages']
     
     enriched_graph = build_enriched_graph(
         normalized_graph,
-        aliases_dict,
+        inputs['redirects']['aliases_dict'],
         missing_pages,
-        existing_pages
+        inputs['crawl']['existing_pages']
     )
     
+    add_page_metadata(enriched_graph, inputs['metadata']['page_metadata'])
+    
+    if RELATED_TOP_K:
+        add_related_pages(enriched_graph)
+    
     export_enriched_graph(enriched_graph)
     export_missing_pages(missing_pages)
     export_legacy_format(normalized_graph)
+    
+    if SNAPSHOT_STORE_PATH:
+        if degraded:
+            # Un grafo parcial metería bajas y altas falsas en el historial
+            print("\n⚠️  Inputs incompletos por errores de API: la corrida no se guarda en el historial")
+        else:
+            record_snapshot(enriched_graph, SNAPSHOT_STORE_PATH)
+
+
+# name: nombre de la etapa (para --from-stage/--only-stage)
+# run: función(inputs, degraded); degraded = algún input salió con errores de API
+# inputs: etapas cuyo output recibe
+# config: constantes de este módulo que afectan su output
+# cache: False para etapas baratas o con efectos (export siempre corre)
+# wiki: True si consulta la wiki (su caché vence cuando la wiki cambia)
+PIPELINE = [
+    {
+        'name': 'crawl',
+        'title': 'PHASE 1: CRAWL BÁSICO',
+        'run': stage_crawl,
+        'inputs': [],
+        'config': ['API_URL', 'EXCLUDE_PREFIXES', 'EXCLUDE_KEYWORDS'],
+        'cache': True,
+        'wiki': True,
+    },
+    {
+        'name': 'redirects',
+        'title': 'PHASE 2: RESOLUCIÓN DE REDIRECTS',
+        'run': stage_redirects,
+        'inputs': ['crawl'],
+        'config': ['API_URL', 'BATCH_SIZE'],
+        'cache': True,
+        'wiki': True,
+    },
+    {
+        'name': 'missing',
+        'title': 'PHASE 3: VERIFICACIÓN DE MISSING PAGES',
+        'run': stage_missing,
+        'inputs': ['crawl', 'redirects'],
+        'config': ['API_URL', 'BATCH_SIZE'],
+        'cache': True,
+        'wiki': True,
+    },
+    {
+        'name': 'metadata',
+        'title': 'PHASE 3b: METADATA DE PÁGINAS',
+        'run': stage_metadata,
+        'inputs': ['crawl'],
+        'config': ['API_URL', 'BATCH_SIZE'],
+        'cache': True,
+        'wiki': True,
+    },
+    {
+        'name': 'export',
+        'title': 'PHASE 4: EXPORT',
+        'run': stage_export,
+        'inputs': ['crawl', 'redirects', 'missing', 'metadata'],
+        'config': [],
+        'cache': False,
+        'wiki': False,
+    },
+]
+
+
+def _stage_key(stage, digests):
+    """Clave de caché: hash del nombre, la config y el contenido de los inputs"""
+    payload = {
+        'stage': stage['name'],
+        'config': {name: globals()[name] for name in stage['config']},
+        'inputs': {name: digests[name] for name in stage['inputs']},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _stage_cache_path(stage, key):
+    return os.path.join(PIPELINE_CACHE_DIR, f"{stage['name']}-{key[:16]}.json")
+
+
+def _cached_revision(path):
+    """Revisión de la wiki guardada junto a un output cacheado (None si no hay)"""
+    try:
+        with open(path + '.rev', encoding='utf-8') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _upstream(name):
+    """La etapa y todas las etapas de las que depende (transitivamente)"""
+    inputs = {stage['name']: stage['inputs'] for stage in PIPELINE}
+    found = {name}
+    pending = [name]
+    while pending:
+        for dependency in inputs[pending.pop()]:
+            if dependency not in found:
+                found.add(dependency)
+                pending.append(dependency)
+    return found
+
+
+def _downstream(name):
+    """La etapa y todas las etapas que dependen de ella (transitivamente)"""
+    return {stage['name'] for stage in PIPELINE if name in _upstream(stage['name'])}
+
+
+def run_pipeline(from_stage=None, only_stage=None):
+    """
+    Corre las etapas de PIPELINE reutilizando outputs cacheados
+    from_stage: recalcula esa etapa y las que dependen de ella
+    only_stage: recalcula solo esa etapa (sus inputs deben estar en caché)
+    """
+    if only_stage:
+        forced_stages = {only_stage}
+        needed_stages = _upstream(only_stage)
+    else:
+        forced_stages = _downstream(from_stage) if from_stage else set()
+        needed_stages = {stage['name'] for stage in PIPELINE}
+    
+    os.makedirs(PIPELINE_CACHE_DIR, exist_ok=True)
+    outputs = {}
+    digests = {}
+    degraded = set()  # Etapas con errores de API (propios o heredados de sus inputs)
+    
+    revision = get_wiki_revision()
+    
+    for stage in PIPELINE:
+        name = stage['name']
+        if name not in needed_stages:
+            continue
+        
+        key = _stage_key(stage, digests)
+        path = _stage_cache_path(stage, key)
+        forced = name in forced_stages
+        
+        if only_stage and not forced and not os.path.exists(path):
+            raise SystemExit(
+                f"❌ --only-stage {only_stage}: no hay caché para '{name}' con la config actual. "
+                f"Corré el pipeline completo primero."
+            )
+        
+        # --only-stage reusa los inputs cacheados aunque la wiki haya cambiado
+        fresh = (
+            only_stage or not stage['wiki']
+            or (revision is not None and _cached_revision(path) == revision)
+        )
+        
+        if stage['cache'] and not forced and os.path.exists(path) and fresh:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            outputs[name] = json.loads(raw)
+            digests[name] = hashlib.sha256(raw).hexdigest()
+            print(f"♻️  {stage['title']}: desde caché ({path})")
+            continue
+        
+        if stage['cache'] and not forced and os.path.exists(path):
+            print(f"🔄 {name}: la wiki cambió desde la caché (o no se pudo verificar); se recalcula")
+        
+        print("\n" + "="*60)
+        print(stage['title'])
+        print("="*60)
+        
+        start = time.time()
+        del _API_ERRORS[:]
+        output = stage['run'](
+            {name: outputs[name] for name in stage['inputs']},
+            bool(degraded.intersection(stage['inputs']))
+        )
+        print(f"⏱️  {name}: {time.time() - start:.2f}s")
+        
+        if _API_ERRORS or degraded.intersection(stage['inputs']):
+            degraded.add(name)
+        
+        if stage['cache']:
+            raw = json.dumps(output, ensure_ascii=False).encode('utf-8')
+            if name in degraded:
+                # Un output parcial no se cachea, y se borra la caché anterior con
+                # la misma clave para que la próxima corrida reintente
+                reason = f"{len(_API_ERRORS)} errores de API" if _API_ERRORS else "inputs incompletos"
+                print(f"⚠️  {name}: {reason}; no se guarda en caché")
+                for stale in (path, path + '.rev'):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+            else:
+                # Escritura atómica: una corrida interrumpida no deja JSON a medias
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(raw)
+                os.replace(path + '.tmp', path)
+                if stage['wiki'] and revision is not None:
+                    with open(path + '.rev', 'w', encoding='utf-8') as f:
+                        f.write(str(revision))
+            outputs[name] = output
+            digests[name] = hashlib.sha256(raw).hexdigest()
+
+
+# ==================== MAIN ====================
+
+def parse_args(argv=None):
+    stage_names = [stage['name'] for stage in PIPELINE]
+    parser = argparse.ArgumentParser(description="Remilia wiki graph crawler v2")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        '--from-stage', choices=stage_names,
+        help="recalcular esta etapa y las que dependen de ella, ignorando la caché"
+    )
+    group.add_argument(
+        '--only-stage', choices=stage_names,
+        help="recalcular solo esta etapa, tomando sus inputs de la caché"
+    )
+    args = parser.parse_args(argv)
+    
+    # El modo disco recrea el edge store en cada corrida y no usa la caché por etapa
+    if DISK_MODE and (args.from_stage or args.only_stage):
+        parser.error("--from-stage/--only-stage no están disponibles con DISK_MODE (siempre corre completo)")
+    
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    if DISK_MODE:
+        return main_disk()
+    
+    print("🌐 REMILIA WIKI GRAPH CRAWLER v2")
+    print("="*60)
+    print("Modo: COMPLETO (con redirects y verificación de missing)\n")
+    
+    run_pipeline(from_stage=args.from_stage, only_stage=args.only_stage)
 
     print("\n✨ Done!")
     print("="*60)